@@ -6,8 +6,14 @@ import json
 import csv
 import argparse
 import pickle
+import time
 from collections import defaultdict
 from pathlib import Path
+from src.application.model.parser.parser import process_file, get_available_files
+from src.application.model.evaluate import evaluate
+from src.application.model.batch import read_seeds
+from src.application.model.model import MarkovModel as BackoffMarkovModel
+from src.application.model.stats import model_stats
 
 class MarkovModel:
     def __init__(self, order=2):
@@ -244,6 +250,31 @@ def list_lyric_files(directory_path=None):
     return "\n".join(files)
 
 
+def print_evaluation(name, report):
+    """Print a held-out evaluation report as a table."""
+    print(f"\n{name}: {report['train_sentences']} train / {report['heldout_sentences']} held-out sentences, "
+          f"{report['heldout_tokens']} tokens scored, OOV {report['oov_rate']:.1%}")
+    print(f"{'order':>5} {'ppl':>10} {'backoff ppl':>12} {'coverage':>9} {'backoff':>8} {'unigram':>8}")
+    for order, r in report['orders'].items():
+        print(f"{order:>5} {r['perplexity']:>10.1f} {r['backoff_perplexity']:>12.1f} "
+              f"{r['coverage']:>9.1%} {r['backoff_rate']:>8.1%} {r['unigram_rate']:>8.1%}")
+
+
+def print_stats(stats):
+    """Print model statistics for one order."""
+    print(f"\nOrder {stats['order']}: {stats['contexts']} contexts, {stats['transitions']} transitions "
+          f"({stats['distinct_transitions']} distinct), vocabulary {stats['vocabulary']}")
+    b = stats['branching']
+    print(f"  Branching: mean {b['mean']:.2f}, median {b['median']:.0f}, p90 {b['p90']:.0f}, max {b['max']}, "
+          f"{b['deterministic_share']:.1%} of contexts have a single successor")
+    print(f"  Entropy: {stats['entropy_bits']:.3f} bits per word")
+    print("  Top contexts: " + ", ".join(f"'{c['context']}' ({c['transitions']})" for c in stats['top_contexts']))
+    print("  Top words: " + ", ".join(f"'{w['word']}' ({w['count']})" for w in stats['top_words']))
+    m = stats['memory_bytes']
+    print(f"  Memory: {m['total'] / 1e6:.1f} MB (dict {m['dict'] / 1e6:.1f}, keys {m['keys'] / 1e6:.1f}, "
+          f"lists {m['lists'] / 1e6:.1f}, words {m['words'] / 1e6:.1f})")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Artist Autocomplete - Generate lyrics based on an artist's style using Markov chains")
     
@@ -268,6 +299,27 @@ def main():
     gen_parser.add_argument('--lines', '-l', help='Number of lines to generate (default: 5)', type=int, default=5)
     gen_parser.add_argument('--seed', help='Seed text to start generation', default=None)
     gen_parser.add_argument('--temp', '-t', help='Temperature for randomness (default: 1.0)', type=float, default=1.0)
+    gen_parser.add_argument('--batch', '-b', help="File of seeds, one per line ('-' for stdin); writes one JSON line per seed", default=None)
+    gen_parser.add_argument('--count', '-c', help='Samples per seed in batch mode (default: 1)', type=int, default=1)
+    
+    # Evaluate command
+    eval_parser = subparsers.add_parser('evaluate', help='Score held-out lyrics under each model order')
+    eval_parser.add_argument('--input', '-i', help='Input file or directory with lyrics', required=True)
+    eval_parser.add_argument('--orders', help='Orders to evaluate (default: 1 2 3 4 5)', type=int, nargs='+', default=[1, 2, 3, 4, 5])
+    eval_parser.add_argument('--holdout', help='Fraction of sentences held out (default: 0.1)', type=float, default=0.1)
+    eval_parser.add_argument('--seed', help='Random seed for the train/held-out split (default: 0)', type=int, default=0)
+    eval_parser.add_argument('--smoothing', help='Weight of the unigram floor (default: 0.01)', type=float, default=0.01)
+    eval_parser.add_argument('--min-count', help='Prune contexts and successors below this count (default: 1)', type=int, default=1)
+    eval_parser.add_argument('--top-k', help='Keep at most K successors per context', type=int, default=None)
+    eval_parser.add_argument('--workers', '-w', help='Worker processes for scoring orders (default: one per CPU)', type=int, default=None)
+    eval_parser.add_argument('--json', help='Print results as JSON', action='store_true')
+    
+    # Stats command
+    stats_parser = subparsers.add_parser('stats', help='Show statistics of models trained on lyrics')
+    stats_parser.add_argument('--input', '-i', help='Input file or directory with lyrics', required=True)
+    stats_parser.add_argument('--orders', help='Orders to analyse (default: 1 2 3 4 5)', type=int, nargs='+', default=[1, 2, 3, 4, 5])
+    stats_parser.add_argument('--top', help='Number of top contexts and words (default: 10)', type=int, default=10)
+    stats_parser.add_argument('--json', help='Print results as JSON', action='store_true')
     
     # Parse arguments
     args = parser.parse_args()
@@ -295,6 +347,11 @@ def main():
             print(model.save(args.save))
     
     elif args.command == 'generate':
+        # Keep stdout for JSON lines in batch mode; progress goes to stderr
+        out = sys.stdout
+        if args.batch:
+            sys.stdout = sys.stderr
+        
         # Load model or train a new one
         if args.model:
             try:
@@ -321,6 +378,20 @@ def main():
             print("Error: Either --model or --input must be specified")
             return
         
+        # Generate lyrics for every seed in the batch, loading the model once
+        if args.batch:
+            for seed in read_seeds(args.batch):
+                start = time.perf_counter()
+                samples = [model.generate(seed=seed, num_lines=args.lines, temperature=args.temp)
+                           for _ in range(args.count)]
+                out.write(json.dumps({
+                    'seed': seed,
+                    'samples': samples,
+                    'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+                }) + '\n')
+                out.flush()
+            return
+        
         # Generate lyrics
         generated = model.generate(
             seed=args.seed,
@@ -332,6 +403,57 @@ def main():
         print("-----------------")
         print(generated)
     
+    elif args.command == 'evaluate':
+        if min(args.orders) < 1:
+            parser.error("--orders must be at least 1")
+        input_path = Path(args.input)
+        files = get_available_files(str(input_path)) if input_path.is_dir() else [str(input_path)]
+        reports = {}
+        for file in files:
+            sentences = process_file(file)
+            try:
+                reports[file] = evaluate(
+                    sentences,
+                    orders=args.orders,
+                    holdout=args.holdout,
+                    seed=args.seed,
+                    smoothing=args.smoothing,
+                    min_count=args.min_count,
+                    top_k=args.top_k,
+                    workers=args.workers
+                )
+            except ValueError as e:
+                print(f"Skipping {file}: {e}")
+                continue
+            if not args.json:
+                print_evaluation(file, reports[file])
+        
+        if args.json:
+            print(json.dumps(reports, indent=2))
+    
+    elif args.command == 'stats':
+        # Keep stdout for the JSON document; progress goes to stderr
+        out = sys.stdout
+        if args.json:
+            sys.stdout = sys.stderr
+        
+        input_path = Path(args.input)
+        files = get_available_files(str(input_path)) if input_path.is_dir() else [str(input_path)]
+        sentences = []
+        for file in files:
+            sentences.extend(process_file(file))
+        
+        results = []
+        for order in args.orders:
+            model = BackoffMarkovModel(order=order)
+            model.train(sentences)
+            results.append(model_stats(model, top=args.top))
+            if not args.json:
+                print_stats(results[-1])
+        
+        if args.json:
+            out.write(json.dumps({'input': str(input_path), 'orders': results}, indent=2) + '\n')
+    
     else:
         parser.print_help()
 
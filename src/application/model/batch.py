@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+import json
+import sys
+import time
+from itertools import islice
+from multiprocessing import Pool
+from src.application.model.parser.prep_data import generate_lyrics
+from src.application.model.shared import SharedModels, init_worker, worker_models
+
+
+def read_seeds(source):
+    """
+    Yield seed prompts one per line, skipping blank lines.
+
+    Args:
+        source (str): path to a prompts file, or '-' for stdin
+
+    Yields:
+        str: seed text
+    """
+    f = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+    try:
+        for line in f:
+            seed = line.strip()
+            if seed:
+                yield seed
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def generate_record(models, order, seed, count=1, max_length=50, temperature=1.0,
+                    ngram_index=None, avoid_copying=False):
+    """
+    Generate samples for one seed and return its JSON-ready result.
+
+    With an ``ngram_index`` the record also carries one ``originality``
+    score (NgramIndex.check) per sample, so callers can filter copies.
+    """
+    stats = {'tokens': 0, 'backoff': 0, 'fallback': 0}
+    start = time.perf_counter()
+    samples = generate_lyrics(models, models[order], seed_text=seed, count=count,
+                              max_length=max_length, stats=stats, temperature=temperature,
+                              ngram_index=ngram_index, avoid_copying=avoid_copying)
+    record = {
+        'seed': seed,
+        'samples': samples,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+        'stats': stats,
+    }
+    if ngram_index is not None:
+        record['originality'] = [ngram_index.check(sample) for sample in samples]
+    return record
+
+
+# n-gram index of a batch worker, set once by _init_worker
+_ngram_index = None
+
+
+def _init_worker(handle, ngram_index):
+    global _ngram_index
+    init_worker(handle)
+    _ngram_index = ngram_index
+
+
+def _worker_record(job):
+    order, seed, count, max_length, temperature, avoid_copying = job
+    return generate_record(worker_models(), order, seed, count, max_length, temperature,
+                           _ngram_index, avoid_copying)
+
+
+def run_batch(models, order, seeds, out=None, count=1, max_length=50, workers=1, window=256,
+              temperature=1.0, ngram_index=None, avoid_copying=False):
+    """
+    Generate samples for many seeds and stream one JSON line per seed.
+
+    Seeds are consumed ``window`` at a time, so memory stays bounded however
+    many prompts arrive. With ``workers`` > 1 the models are published once
+    into shared memory and a process pool generates each window; output
+    keeps the input order either way.
+
+    Args:
+        models (dict[int, MarkovModel] | callable): trained models keyed by
+            order, or a function returning the current set (e.g. from a
+            ModelWatcher), called once per seed; worker pools take one
+            snapshot when they start
+        order (int): order of the primary model
+        seeds (iterable[str]): seed prompts
+        out (file, optional): where to write JSON lines (default: stdout)
+        count (int): samples per seed
+        max_length (int): max tokens per sample
+        workers (int): worker processes; 1 generates in this process
+        window (int): seeds in flight at once
+        temperature (float): sampling temperature, as for generate_lyrics
+        ngram_index (NgramIndex, optional): index of the training text; adds
+            per-sample originality scores to every record
+        avoid_copying (bool): steer away from verbatim runs of the index
+
+    Returns:
+        int: number of seeds processed
+    """
+    out = out or sys.stdout
+    seeds = iter(seeds)
+    processed = 0
+    current = models if callable(models) else (lambda: models)
+
+    if workers <= 1:
+        for seed in seeds:
+            record = generate_record(current(), order, seed, count, max_length, temperature,
+                                     ngram_index, avoid_copying)
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            processed += 1
+        return processed
+
+    with SharedModels.publish(current()) as shared:
+        with Pool(workers, initializer=_init_worker, initargs=(shared.handle, ngram_index)) as pool:
+            while True:
+                jobs = [(order, seed, count, max_length, temperature, avoid_copying)
+                        for seed in islice(seeds, window)]
+                if not jobs:
+                    break
+                for record in pool.imap(_worker_record, jobs, chunksize=max(1, len(jobs) // (workers * 4))):
+                    out.write(json.dumps(record) + '\n')
+                    processed += 1
+                out.flush()
+    return processed
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Mapping, Sequence
+from src.application.model.model import MarkovModel
+
+# Buffer layout: a fixed header followed by 8-byte aligned sections.
+#   vocab_offsets  int64[n_vocab + 1]  byte offsets into vocab_blob
+#   vocab_blob     utf-8 words, concatenated
+#   ctx_hash       int64[n_ctx]        hash of each context's id tuple, sorted
+#   ctx_ids        int32[n_ctx*order]  context word ids, same order as ctx_hash
+#   succ_offsets   int64[n_ctx + 1]    slice of succ_ids/succ_cum per context
+#   succ_ids       int32[n_succ]       distinct successor ids per context
+#   succ_cum       int64[n_succ]       running successor counts per context
+#   starts         int32[n_starts*order]
+MAGIC = b'MKV1'
+HEADER = struct.Struct('<4s7q')
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _context_hash(ids):
+    # tuple-of-int hashes do not depend on PYTHONHASHSEED, so every process
+    # running the same interpreter computes the same value
+    return hash(tuple(ids))
+
+
+class Successors(Sequence):
+    """
+    Successor words of one context, read straight from the packed arrays.
+
+    Behaves like the successor list of ``MarkovModel.model`` (every
+    occurrence counted), so ``random.choice`` samples with the same
+    probabilities without materialising the list.
+    """
+
+    def __init__(self, compact, index):
+        self._compact = compact
+        self._start = compact.succ_offsets[index]
+        self._end = compact.succ_offsets[index + 1]
+
+    def __len__(self):
+        return self._compact.succ_cum[self._end - 1]
+
+    def __getitem__(self, k):
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError('successor index out of range')
+        c = self._compact
+        j = bisect_right(c.succ_cum, k, self._start, self._end)
+        return c.words[c.succ_ids[j]]
+
+    def counts(self):
+        """Return a dict mapping each distinct successor to its count."""
+        c = self._compact
+        result = {}
+        prev = 0
+        for j in range(self._start, self._end):
+            cum = c.succ_cum[j]
+            result[c.words[c.succ_ids[j]]] = cum - prev
+            prev = cum
+        return result
+
+
+class CompactTransitions(Mapping):
+    """Read-only ``context tuple -> Successors`` view over packed arrays."""
+
+    def __init__(self, buf):
+        self._views = []
+        mv = memoryview(buf)
+        magic, order, n_vocab, n_ctx, n_succ, n_starts, blob_len, size = HEADER.unpack_from(mv, 0)
+        if magic != MAGIC:
+            raise ValueError("Buffer does not contain a compact Markov model")
+        self.order = order
+        self.size = size
+
+        pos = _align(HEADER.size)
+
+        def section(typecode, count, itemsize):
+            nonlocal pos
+            view = mv[pos:pos + count * itemsize].cast(typecode)
+            self._views.append(view)
+            pos = _align(pos + count * itemsize)
+            return view
+
+        vocab_offsets = section('q', n_vocab + 1, 8)
+        blob = mv[pos:pos + blob_len]
+        self._views.append(blob)
+        pos = _align(pos + blob_len)
+        self.ctx_hash = section('q', n_ctx, 8)
+        self.ctx_ids = section('i', n_ctx * order, 4)
+        self.succ_offsets = section('q', n_ctx + 1, 8)
+        self.succ_ids = section('i', n_succ, 4)
+        self.succ_cum = section('q', n_succ, 8)
+        self.start_ids = section('i', n_starts * order, 4)
+        self._views.append(mv)
+
+        # the vocabulary is the only per-process copy
+        self.words = [bytes(blob[vocab_offsets[i]:vocab_offsets[i + 1]]).decode('utf-8')
+                      for i in range(n_vocab)]
+        self.ids = {w: i for i, w in enumerate(self.words)}
+        self._keys = None
+
+    def find(self, ids):
+        """Return the row index of a context given as word ids, or -1."""
+        order = self.order
+        h = _context_hash(ids)
+        i = bisect_left(self.ctx_hash, h)
+        n = len(self.ctx_hash)
+        while i < n and self.ctx_hash[i] == h:
+            if tuple(self.ctx_ids[i * order:(i + 1) * order]) == ids:
+                return i
+            i += 1
+        return -1
+
+    def __getitem__(self, context):
+        if len(context) != self.order:
+            raise KeyError(context)
+        try:
+            ids = tuple(self.ids[w] for w in context)
+        except KeyError:
+            raise KeyError(context) from None
+        i = self.find(ids)
+        if i < 0:
+            raise KeyError(context)
+        return Successors(self, i)
+
+    def __iter__(self):
+        order = self.order
+        words = self.words
+        for i in range(len(self.ctx_hash)):
+            yield tuple(words[w] for w in self.ctx_ids[i * order:(i + 1) * order])
+
+    def __len__(self):
+        return len(self.ctx_hash)
+
+    def keys(self):
+        # generate_with_backoff's last-resort fallback lists the order-1
+        # keys on every call, so decode them once per process
+        if self._keys is None:
+            self._keys = tuple(self)
+        return self._keys
+
+    def release(self):
+        """Release the buffer views so the underlying memory can be closed."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+
+
+class CompactStarts(Sequence):
+    """Sentence starts of a compact model as a sequence of word tuples."""
+
+    def __init__(self, transitions):
+        self._t = transitions
+
+    def __len__(self):
+        return len(self._t.start_ids) // self._t.order if self._t.order else 0
+
+    def __getitem__(self, k):
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError('start index out of range')
+        order = self._t.order
+        return tuple(self._t.words[w] for w in self._t.start_ids[k * order:(k + 1) * order])
+
+
+def pack_model(model):
+    """
+    Pack a trained MarkovModel into a single flat bytes buffer.
+
+    Args:
+        model (MarkovModel): trained model
+
+    Returns:
+        bytearray: buffer readable by CompactMarkovModel
+    """
+    order = model.order
+    ids = {}
+    words = []
+
+    def word_id(w):
+        i = ids.get(w)
+        if i is None:
+            i = ids[w] = len(words)
+            words.append(w)
+        return i
+
+    rows = []
+    for ctx, nexts in model.model.items():
+        if not nexts:
+            continue
+        ctx_ids = tuple(word_id(w) for w in ctx)
+        succ = [(word_id(w), c) for w, c in Counter(nexts).items()]
+        rows.append((_context_hash(ctx_ids), ctx_ids, succ))
+    rows.sort(key=lambda r: r[0])
+    start_ids = [word_id(w) for start in model.starts for w in start]
+
+    vocab_offsets = array('q', [0])
+    blob = bytearray()
+    for w in words:
+        blob += w.encode('utf-8')
+        vocab_offsets.append(len(blob))
+
+    ctx_hash = array('q', (r[0] for r in rows))
+    ctx_ids = array('i')
+    succ_offsets = array('q', [0])
+    succ_ids = array('i')
+    succ_cum = array('q')
+    for _, cids, succ in rows:
+        ctx_ids.extend(cids)
+        total = 0
+        for w, c in succ:
+            total += c
+            succ_ids.append(w)
+            succ_cum.append(total)
+        succ_offsets.append(len(succ_ids))
+    starts = array('i', start_ids)
+
+    sections = [vocab_offsets.tobytes(), bytes(blob), ctx_hash.tobytes(), ctx_ids.tobytes(),
+                succ_offsets.tobytes(), succ_ids.tobytes(), succ_cum.tobytes(), starts.tobytes()]
+    size = _align(HEADER.size) + sum(_align(len(s)) for s in sections)
+    buf = bytearray(size)
+    HEADER.pack_into(buf, 0, MAGIC, order, len(words), len(rows), len(succ_ids),
+                     len(model.starts), len(blob), size)
+    pos = _align(HEADER.size)
+    for s in sections:
+        buf[pos:pos + len(s)] = s
+        pos += _align(len(s))
+    return buf
+
+
+class CompactMarkovModel:
+    """
+    Read-only MarkovModel backed by a packed buffer.
+
+    The buffer can be a bytes object, an mmap or a shared memory block; the
+    transition tables are read in place, so any number of processes can
+    share one copy. Works anywhere a trained MarkovModel is expected for
+    generation, including as a back-off model for generate_with_backoff.
+    """
+
+    def __init__(self, buf):
+        self.model = CompactTransitions(buf)
+        self.order = self.model.order
+        self.starts = CompactStarts(self.model)
+        self._constrained = {}
+
+    constrain = MarkovModel.constrain
+    _novel_successor = MarkovModel._novel_successor
+    generate_with_backoff = MarkovModel.generate_with_backoff
+
+    @classmethod
+    def from_model(cls, model):
+        """Build a compact copy of a trained MarkovModel."""
+        return cls(pack_model(model))
+
+    def release(self):
+        """Drop all references into the backing buffer."""
+        self.model.release()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+from collections import defaultdict
+
+
+class VocabularyFilter:
+    """
+    Words generation may or may not produce.
+
+    Args:
+        blocklist (iterable[str], optional): words never to generate
+        allowlist (iterable[str], optional): if given, the only words that
+            may be generated (punctuation tokens are always allowed)
+    """
+
+    PUNCTUATION = frozenset({'.', '!', '?', ','})
+
+    def __init__(self, blocklist=None, allowlist=None):
+        self.blocklist = frozenset(w.lower() for w in blocklist or ())
+        self.allowlist = frozenset(w.lower() for w in allowlist) if allowlist is not None else None
+        # hashable identity of the constraint set, used as the cache key
+        self.key = (self.blocklist, self.allowlist)
+
+    def allows(self, word):
+        """True if ``word`` may be generated."""
+        if word in self.blocklist:
+            return False
+        return self.allowlist is None or word in self.allowlist or word in self.PUNCTUATION
+
+    def blocked_in(self, vocabulary):
+        """Return the subset of ``vocabulary`` this filter rejects."""
+        return {w for w in vocabulary if not self.allows(w)}
+
+    @classmethod
+    def from_files(cls, blocklist_path=None, allowlist_path=None):
+        """Build a filter from word-list files (one word per line, '#' comments)."""
+        return cls(_read_words(blocklist_path) if blocklist_path else None,
+                   _read_words(allowlist_path) if allowlist_path else None)
+
+
+def _read_words(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def mask_table(table, starts, vocab_filter):
+    """
+    Compile a transition table under a vocabulary filter.
+
+    Successor lists lose their rejected words, which renormalises the
+    sampling distribution; lists with nothing rejected are shared, not
+    copied. Contexts left with no successors are dead ends and are dropped,
+    so generate_with_backoff backs off to a lower order instead.
+
+    Args:
+        table (Mapping): context -> successor list
+        starts (list[tuple]): sentence starts
+        vocab_filter (VocabularyFilter): constraint set
+
+    Returns:
+        tuple[defaultdict, list, dict]: masked table, allowed starts and a
+        report of dropped contexts and transitions
+    """
+    vocabulary = set()
+    for ctx, nexts in table.items():
+        vocabulary.update(ctx)
+        vocabulary.update(set(nexts))
+    for start in starts:
+        vocabulary.update(start)
+    blocked = vocab_filter.blocked_in(vocabulary)
+
+    masked = defaultdict(list)
+    dead_ends = 0
+    dropped = 0
+    for ctx, nexts in table.items():
+        if not blocked.isdisjoint(ctx):
+            # unreachable: generation never emits a blocked word
+            continue
+        if blocked.isdisjoint(nexts):
+            masked[ctx] = nexts
+            continue
+        kept = [w for w in nexts if w not in blocked]
+        dropped += len(nexts) - len(kept)
+        if kept:
+            masked[ctx] = kept
+        else:
+            dead_ends += 1
+    allowed_starts = [s for s in starts if blocked.isdisjoint(s)]
+    return masked, allowed_starts, {
+        'blocked_words': len(blocked),
+        'dead_ends': dead_ends,
+        'transitions_dropped': dropped,
+    }
+
+
+def constrain_models(models, vocab_filter):
+    """Return the models dict with every model compiled under ``vocab_filter``."""
+    if vocab_filter is None:
+        return models
+    return {o: m.constrain(vocab_filter) for o, m in models.items()}
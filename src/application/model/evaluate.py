@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+import math
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.application.model.model import MarkovModel
+from src.application.model.tokens import tokenize
+
+# multiplier for the rolling context hash; uint64 arithmetic wraps mod 2**64
+_HASH_MUL = np.uint64(0x9E3779B97F4A7C15)
+
+
+def split_sentences(sentences, holdout=0.1, seed=0):
+    """
+    Shuffle sentences and split them into train and held-out sets.
+
+    Args:
+        sentences (list[str]): sentences from process_file
+        holdout (float): fraction of sentences to hold out
+        seed (int): shuffle seed, so runs are repeatable
+
+    Returns:
+        tuple[list[str], list[str]]: (train, held_out)
+    """
+    shuffled = list(sentences)
+    random.Random(seed).shuffle(shuffled)
+    n_held = int(round(len(shuffled) * holdout))
+    return shuffled[n_held:], shuffled[:n_held]
+
+
+def _hash_rows(ids):
+    """Hash each row of a 2-D id array into one uint64 key."""
+    h = np.zeros(ids.shape[0], dtype=np.uint64)
+    for col in range(ids.shape[1]):
+        h = h * _HASH_MUL + ids[:, col].astype(np.uint64) + np.uint64(1)
+    return h
+
+
+def _lookup(sorted_keys, keys):
+    """Vectorised membership: return (index, found) of keys in sorted_keys."""
+    idx = np.searchsorted(sorted_keys, keys)
+    idx = np.minimum(idx, max(len(sorted_keys) - 1, 0))
+    found = sorted_keys[idx] == keys if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+    return idx, found
+
+
+def _model_tables(model, vocab):
+    """
+    Turn a MarkovModel into sorted key/count arrays.
+
+    Returns (context keys, context totals, pair keys, pair counts), where a
+    pair key is the hash of the context extended by the successor id.
+    """
+    ctx_rows = []
+    totals = []
+    pair_rows = []
+    pair_counts = []
+    for ctx, nexts in model.model.items():
+        if not nexts:
+            continue
+        row = [vocab.get(w, 0) for w in ctx]
+        ctx_rows.append(row)
+        totals.append(len(nexts))
+        for w, c in Counter(nexts).items():
+            pair_rows.append(row + [vocab.get(w, 0)])
+            pair_counts.append(c)
+    order = model.order
+    ctx_keys = _hash_rows(np.array(ctx_rows, dtype=np.int64).reshape(-1, order))
+    pair_keys = _hash_rows(np.array(pair_rows, dtype=np.int64).reshape(-1, order + 1))
+    ci = np.argsort(ctx_keys)
+    pi = np.argsort(pair_keys)
+    return (ctx_keys[ci], np.array(totals, dtype=np.float64)[ci],
+            pair_keys[pi], np.array(pair_counts, dtype=np.float64)[pi])
+
+
+def _encode(sentences, vocab):
+    """Concatenate tokenised sentences into id and in-sentence position arrays."""
+    ids = []
+    pos = []
+    for sentence in sentences:
+        words = tokenize(sentence)
+        ids.extend(vocab.get(w, 0) for w in words)
+        pos.extend(range(len(words)))
+    return np.array(ids, dtype=np.int64), np.array(pos, dtype=np.int64)
+
+
+def _context_windows(ids, pos, order):
+    """Return the (n, order) array of preceding ids and a validity mask."""
+    n = len(ids)
+    window = np.zeros((n, order), dtype=np.int64)
+    for k in range(order):
+        shift = order - k
+        window[shift:, k] = ids[:n - shift] if n > shift else []
+    return window, pos >= order
+
+
+def score_order(order, train, held_ids, held_pos, vocab, min_count=1, top_k=None):
+    """
+    Train one order and score every held-out token against it.
+
+    Args:
+        order (int): Markov order
+        train (list[str]): training sentences
+        held_ids (np.ndarray): held-out token ids
+        held_pos (np.ndarray): position of each token within its sentence
+        vocab (dict[str, int]): training vocabulary, 0 reserved for unknown
+        min_count (int): pruning threshold passed to MarkovModel.prune
+        top_k (int, optional): successor cap passed to MarkovModel.prune
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: per-token flag for a seen context and
+        the model probability of the token given that context (0 if unseen)
+    """
+    model = MarkovModel(order=order)
+    model.train(train)
+    if min_count > 1 or top_k:
+        model.prune(min_count=min_count, top_k=top_k)
+    ctx_keys, totals, pair_keys, pair_counts = _model_tables(model, vocab)
+
+    window, valid = _context_windows(held_ids, held_pos, order)
+    keys = _hash_rows(window)
+    ci, seen = _lookup(ctx_keys, keys)
+    seen &= valid
+    pair = keys * _HASH_MUL + held_ids.astype(np.uint64) + np.uint64(1)
+    pi, hit = _lookup(pair_keys, pair)
+    hit &= seen
+    prob = np.where(hit, pair_counts[pi] / np.where(seen, totals[ci], 1.0), 0.0)
+    return seen, prob
+
+
+def _perplexity(prob):
+    return math.exp(-float(np.mean(np.log(prob)))) if len(prob) else float('nan')
+
+
+def evaluate(sentences, orders=(1, 2, 3, 4, 5), holdout=0.1, seed=0, smoothing=0.01,
+             min_count=1, top_k=None, workers=None):
+    """
+    Score held-out sentences under each Markov order, with and without back-off.
+
+    Probabilities are interpolated with an add-one unigram distribution
+    (weight ``smoothing``) so unseen tokens keep perplexity finite. The
+    back-off scheme mirrors generate_with_backoff: the longest context the
+    models have seen is used, falling back to the unigram distribution.
+
+    Args:
+        sentences (list[str]): sentences from process_file
+        orders (iterable[int]): orders to evaluate
+        holdout (float): fraction of sentences held out
+        seed (int): split seed
+        smoothing (float): weight of the unigram floor, in (0, 1]
+        min_count (int): prune threshold applied to every order
+        top_k (int, optional): successor cap applied to every order
+        workers (int, optional): processes for scoring orders in parallel;
+            1 scores them in this process
+
+    Returns:
+        dict: token counts plus per-order perplexity, coverage and back-off
+        rates
+    """
+    if not 0 < smoothing <= 1:
+        raise ValueError("smoothing must be in (0, 1]")
+    orders = sorted(set(orders))
+    if not orders or orders[0] < 1:
+        raise ValueError("orders must be at least 1")
+    train, held = split_sentences(sentences, holdout, seed)
+    if not train or not held:
+        raise ValueError("Not enough sentences to split into train and held-out sets")
+
+    unigrams = Counter(w for s in train for w in tokenize(s))
+    vocab = {w: i for i, w in enumerate(unigrams, start=1)}
+    held_ids, held_pos = _encode(held, vocab)
+    unigram_counts = np.zeros(len(vocab) + 1)
+    unigram_counts[1:] = list(unigrams.values())
+
+    # every order predicts the same tokens: all but the first of a sentence
+    target = held_pos >= 1
+    p_uni = unigram_counts[held_ids] / unigram_counts.sum()
+    p_floor = (unigram_counts[held_ids] + 1) / (unigram_counts.sum() + len(vocab) + 1)
+
+    levels = range(1, max(orders) + 1)
+    if workers == 1:
+        results = [score_order(o, train, held_ids, held_pos, vocab, min_count, top_k) for o in levels]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(score_order, o, train, held_ids, held_pos, vocab, min_count, top_k)
+                       for o in levels]
+            results = [f.result() for f in futures]
+    seen = {o: r[0][target] for o, r in zip(levels, results)}
+    prob = {o: r[1][target] for o, r in zip(levels, results)}
+    p_uni = p_uni[target]
+    p_floor = p_floor[target]
+    n = int(target.sum())
+
+    report = {
+        'train_sentences': len(train),
+        'heldout_sentences': len(held),
+        'heldout_tokens': n,
+        'oov_rate': float(np.mean(held_ids[target] == 0)) if n else 0.0,
+        'orders': {},
+    }
+    for o in orders:
+        plain = (1 - smoothing) * prob[o] + smoothing * p_floor
+
+        # back-off: pick the highest order <= o whose context was seen
+        chosen = np.zeros(n, dtype=np.int64)
+        backed = np.array(p_uni)
+        for k in range(1, o + 1):
+            backed = np.where(seen[k], prob[k], backed)
+            chosen = np.where(seen[k], k, chosen)
+        backed = (1 - smoothing) * backed + smoothing * p_floor
+
+        report['orders'][o] = {
+            'perplexity': _perplexity(plain),
+            'backoff_perplexity': _perplexity(backed),
+            'coverage': float(np.mean(seen[o])) if n else 0.0,
+            'backoff_rate': float(np.mean((chosen > 0) & (chosen < o))) if n else 0.0,
+            'unigram_rate': float(np.mean(chosen == 0)) if n else 0.0,
+            'hit_rate': float(np.mean(prob[o] > 0)) if n else 0.0,
+        }
+    return report
@@ -1,16 +1,35 @@
 #!/usr/bin/env python3
+import pickle
 import random
 import re
-from collections import defaultdict
+from collections import Counter, defaultdict
 from src.application.model.parser.prep_data import generate_lyrics
+from src.application.model.pruning import prune_model
+from src.application.model.constraints import mask_table
+
+
+def _sample(choices, temperature=1.0):
+    # draw from a successor list; each distinct word is weighted by
+    # count ** (1 / temperature), so < 1 favours common words, > 1 flattens
+    if temperature == 1.0:
+        return random.choice(choices)
+    counts = choices.counts() if hasattr(choices, 'counts') else Counter(choices)
+    words = list(counts)
+    # scaled by the top count so the weights stay in [0, 1] (the top word
+    # keeps weight 1) and cannot overflow for small temperatures
+    top = max(counts.values())
+    return random.choices(words, weights=[(counts[w] / top) ** (1 / temperature) for w in words])[0]
+
 
 class MarkovModel:
     def __init__(self, order=2):
         self.order = order
         self.model = defaultdict(list)
         self.starts = []
+        self._constrained = {}
         
     def train(self, sentences):
+        self._constrained = {}
         for sentence in sentences:
             words = re.findall(r'\b\w+\b|[.!?,]', sentence.lower())
             if len(words) <= self.order:
@@ -19,9 +38,61 @@ class MarkovModel:
             for i in range(len(words) - self.order):
                 ctx = tuple(words[i:i+self.order])
                 self.model[ctx].append(words[i + self.order])
-                
-    def generate_with_backoff(self, models, seed_words=None, max_length=50):
-        if not self.model:
+
+    def save(self, filename):
+        """Save the trained model to a file."""
+        with open(filename, 'wb') as f:
+            pickle.dump((self.model, self.starts, self.order), f)
+
+    @classmethod
+    def load(cls, filename):
+        """Load a model saved with save()."""
+        with open(filename, 'rb') as f:
+            model_data, starts, order = pickle.load(f)
+        loaded = cls(order)
+        loaded.model = model_data
+        loaded.starts = starts
+        return loaded
+
+    def prune(self, min_count=1, top_k=None, memory_budget=None):
+        """Drop rare contexts/successors in place; see pruning.prune_model."""
+        self._constrained = {}
+        return prune_model(self, min_count=min_count, top_k=top_k, memory_budget=memory_budget)
+
+    def constrain(self, vocab_filter):
+        """
+        Return a copy of this model that can only emit words allowed by
+        ``vocab_filter``, compiled once and cached per constraint set.
+        """
+        masked = self._constrained.get(vocab_filter.key)
+        if masked is None:
+            masked = MarkovModel(order=self.order)
+            masked.model, masked.starts, masked.constraint_report = mask_table(
+                self.model, self.starts, vocab_filter)
+            self._constrained[vocab_filter.key] = masked
+        return masked
+
+    def _novel_successor(self, models, result, window, temperature=1.0):
+        # first successor table, from this order down, offering a word that
+        # does not extend a verbatim run of the corpus
+        for o in range(self.order, 0, -1):
+            table = self.model if o == self.order else models[o].model if o in models else None
+            ctx = tuple(result[-o:])
+            if table is None or len(result) < o or ctx not in table:
+                continue
+            choices = table[ctx]
+            copying = {w for w in set(choices) if window.would_copy(w)}
+            options = [w for w in choices if w not in copying]
+            if options:
+                return _sample(options, temperature)
+        return None
+
+    def generate_with_backoff(self, models, seed_words=None, max_length=50,
+                              ngram_index=None, avoid_copying=False, stats=None, temperature=1.0):
+        # stats, if given, is a dict whose 'tokens', 'backoff' and 'fallback'
+        # counters are incremented as words are generated; temperature
+        # reweights each successor list (see _sample)
+        if not self.model and not any(m.model for m in models.values()):
             return "Model has not been trained yet."
         # choose start
         if seed_words and len(seed_words) >= self.order:
@@ -32,11 +103,12 @@ class MarkovModel:
                 return "Cannot generate text: no sentence starts found."
             current = random.choice(self.starts)
             result = list(current)
+        window = ngram_index.window(result) if ngram_index is not None else None
 
         # generate
         while len(result) < max_length:
             if current in self.model:
-                nxt = random.choice(self.model[current])
+                nxt = _sample(self.model[current], temperature)
             else:
                 # back off
                 found = False
@@ -44,18 +116,27 @@ class MarkovModel:
                     if o in models and len(result) >= o:
                         short = tuple(result[-o:])
                         if short in models[o].model:
-                            nxt = random.choice(models[o].model[short])
+                            nxt = _sample(models[o].model[short], temperature)
                             found = True
                             break
                 if not found:
                     base = models.get(1)
                     if base and base.model:
                         ctx = random.choice(list(base.model.keys()))
-                        nxt = random.choice(base.model[ctx])
+                        nxt = _sample(base.model[ctx], temperature)
                     else:
                         break
+                if stats is not None:
+                    key = 'backoff' if found else 'fallback'
+                    stats[key] = stats.get(key, 0) + 1
 
+            if avoid_copying and window is not None and window.would_copy(nxt):
+                nxt = self._novel_successor(models, result, window, temperature) or nxt
             result.append(nxt)
+            if stats is not None:
+                stats['tokens'] = stats.get('tokens', 0) + 1
+            if window is not None:
+                window.push_word(nxt)
             current = tuple(result[-self.order:])
             if nxt in {'.','!','?'} and len(result) > max_length//2:
                 break
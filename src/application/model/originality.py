@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+from src.application.model.tokens import tokenize
+
+# polynomial rolling hash over word ids, modulo the Mersenne prime 2**61 - 1
+_MOD = (1 << 61) - 1
+_BASE = 0x5DEECE66D
+
+
+class NgramIndex:
+    """
+    Hashes of every ``length``-token run in the training sentences.
+
+    Lets generation check in O(1) per token whether its last ``length``
+    tokens appear verbatim in the corpus, and scores finished samples for
+    originality. Runs never cross sentence boundaries, matching how
+    MarkovModel.train sees the text.
+    """
+
+    def __init__(self, sentences, length=8):
+        if length < 2:
+            raise ValueError("length must be at least 2")
+        self.length = length
+        self.vocab = {}
+        self.hashes = set()
+        # weight of the oldest token in a full window
+        self._drop = pow(_BASE, length - 1, _MOD)
+        for sentence in sentences:
+            ids = [self.vocab.setdefault(w, len(self.vocab) + 1) for w in tokenize(sentence)]
+            window = self.window()
+            for i in ids:
+                if window.push(i):
+                    self.hashes.add(window.hash)
+
+    def window(self, tokens=()):
+        """Return a RollingWindow over this index, primed with ``tokens``."""
+        window = RollingWindow(self)
+        for w in tokens:
+            window.push_word(w)
+        return window
+
+    def check(self, tokens):
+        """
+        Score a token sequence against the corpus.
+
+        Args:
+            tokens (list[str] | str): generated tokens, or text to tokenize
+
+        Returns:
+            dict: ``originality`` (share of ``length``-token windows not found
+            in the corpus, 1.0 if the sample is shorter than one window) and
+            ``longest_copy`` (longest verbatim run in tokens, 0 if none
+            reaches ``length``)
+        """
+        if isinstance(tokens, str):
+            tokens = tokenize(tokens)
+        window = RollingWindow(self)
+        windows = copied = run = longest = 0
+        for w in tokens:
+            if not window.push(self.vocab.get(w, 0)):
+                continue
+            windows += 1
+            if window.hash in self.hashes:
+                copied += 1
+                run = run + 1 if run else self.length
+                longest = max(longest, run)
+            else:
+                run = 0
+        return {
+            'originality': 1 - copied / windows if windows else 1.0,
+            'longest_copy': longest,
+        }
+
+
+class RollingWindow:
+    """Hash of the last ``index.length`` token ids, updated in O(1)."""
+
+    def __init__(self, index):
+        self.index = index
+        self.ids = []
+        self.hash = 0
+
+    def push(self, token_id):
+        """Append a token id; return True once the window is full."""
+        index = self.index
+        if len(self.ids) == index.length:
+            self.hash = (self.hash - self.ids.pop(0) * index._drop) % _MOD
+        self.ids.append(token_id)
+        self.hash = (self.hash * _BASE + token_id) % _MOD
+        return len(self.ids) == index.length
+
+    def push_word(self, word):
+        """Append a word, mapping words unseen in the corpus to id 0."""
+        return self.push(self.index.vocab.get(word, 0))
+
+    def would_copy(self, word):
+        """True if appending ``word`` would complete a run seen in the corpus."""
+        index = self.index
+        token_id = index.vocab.get(word, 0)
+        if not token_id or len(self.ids) < index.length - 1:
+            return False
+        h = self.hash
+        if len(self.ids) == index.length:
+            h = (h - self.ids[0] * index._drop) % _MOD
+        return (h * _BASE + token_id) % _MOD in index.hashes
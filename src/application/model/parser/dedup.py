@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+import numpy as np
+from src.application.model.tokens import tokenize
+
+POLICIES = ('drop', 'downweight', 'keep')
+
+# universal hashing (a*x + b) mod p over 32-bit shingle hashes; a*x stays
+# below 2**63, so uint64 arithmetic cannot overflow
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+def split_sections(text):
+    """
+    Split a song into sections (blocks separated by blank lines).
+
+    Text without any blank line (e.g. one song per line) is split by line.
+
+    Args:
+        text (str): raw lyrics
+
+    Returns:
+        list[str]: non-empty sections
+    """
+    blocks = re.split(r'\n\s*\n', text)
+    if len(blocks) == 1:
+        blocks = text.split('\n')
+    return [b for b in blocks if b.strip()]
+
+
+def _words(text):
+    # drop section headers like "[Chorus]" so they don't make blocks look alike
+    return re.findall(r"[a-z0-9']+", re.sub(r'\[[^\]]*\]', ' ', text.lower()))
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles.
+
+    Args:
+        num_perm (int): signature length
+        shingle_size (int): words per shingle
+        seed (int): seed for the hash permutations, shared by all processes
+    """
+
+    def __init__(self, num_perm=64, shingle_size=3, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        """
+        Return (exact key, MinHash signature) for a section.
+
+        The exact key is a 128-bit digest of the normalised words, wide
+        enough that distinct sections do not collide at corpus scale; the
+        signature is None for sections shorter than one shingle, which can
+        then only match exactly.
+        """
+        words = _words(text)
+        exact = hashlib.blake2b(' '.join(words).encode('utf-8'), digest_size=16).digest()
+        k = self.shingle_size
+        if len(words) < k:
+            return exact, None
+        shingles = np.fromiter(
+            {zlib.crc32(' '.join(words[i:i + k]).encode('utf-8')) for i in range(len(words) - k + 1)},
+            dtype=np.uint64)
+        hashed = (self._a[:, None] * shingles[None, :] + self._b[:, None]) % _PRIME
+        return exact, hashed.min(axis=1)
+
+
+class DuplicateIndex:
+    """
+    LSH index assigning each section to a cluster of near-duplicates.
+
+    Signatures are split into ``bands``; sections sharing any band are
+    candidates, and join a cluster when their estimated Jaccard similarity
+    reaches ``threshold``.
+
+    Args:
+        threshold (float): minimum estimated Jaccard similarity
+        bands (int): LSH bands; must divide the signature length
+    """
+
+    def __init__(self, threshold=0.8, bands=16):
+        self.threshold = threshold
+        self.bands = bands
+        self.exact = {}
+        self.buckets = defaultdict(list)
+        self.signatures = []
+
+    def add(self, exact, signature):
+        """Register a section and return its cluster id."""
+        cluster = self.exact.get(exact)
+        if cluster is not None:
+            return cluster
+        keys = []
+        if signature is not None:
+            rows = len(signature) // self.bands
+            for band in range(self.bands):
+                key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+                keys.append(key)
+                for other in self.buckets.get(key, ()):
+                    if np.mean(self.signatures[other] == signature) >= self.threshold:
+                        cluster = other
+                        break
+                if cluster is not None:
+                    break
+        if cluster is None:
+            cluster = len(self.signatures)
+            self.signatures.append(signature)
+            for key in keys:
+                self.buckets[key].append(cluster)
+        self.exact[exact] = cluster
+        return cluster
+
+
+def _count_tokens(text):
+    # word tokens of raw text; close to, but not exactly, what a model
+    # trained on the cleaned sentences sees
+    return sum(1 for t in tokenize(text) if t not in '.!?,')
+
+
+def select_sections(sections, signatures, policy='drop', threshold=0.8, max_copies=2, bands=16,
+                    token_counts=None):
+    """
+    Decide which sections to keep, across all documents, in order.
+
+    Args:
+        sections (dict[Hashable, list[str]]): sections per document (e.g.
+            per file, or per song keyed by (file, index))
+        signatures (dict[Hashable, list[tuple]]): MinHasher.signature per
+            section
+        policy (str): 'drop' keeps the first copy of each duplicate cluster,
+            'downweight' keeps up to ``max_copies``, 'keep' keeps everything
+            and only reports
+        threshold (float): near-duplicate similarity threshold
+        max_copies (int): copies kept per cluster under 'downweight'
+        bands (int): LSH bands
+        token_counts (dict[Hashable, list[int]], optional): model tokens per
+            section, for the report; approximated from the raw text if omitted
+
+    Returns:
+        tuple[dict[Hashable, list[str]], dict]: kept sections per document,
+        and a report with section and token counts
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown dedup policy {policy!r}; expected one of {POLICIES}")
+    limit = {'drop': 1, 'downweight': max_copies, 'keep': None}[policy]
+    index = DuplicateIndex(threshold, bands)
+    seen = defaultdict(int)
+    kept = {}
+    report = {'policy': policy, 'sections': 0, 'duplicate_sections': 0,
+              'sections_removed': 0, 'tokens': 0, 'tokens_removed': 0}
+    for path, file_sections in sections.items():
+        kept[path] = []
+        counts = token_counts[path] if token_counts is not None else map(_count_tokens, file_sections)
+        for text, (exact, signature), tokens in zip(file_sections, signatures[path], counts):
+            cluster = index.add(exact, signature)
+            seen[cluster] += 1
+            report['sections'] += 1
+            report['tokens'] += tokens
+            if seen[cluster] > 1:
+                report['duplicate_sections'] += 1
+            if limit is not None and seen[cluster] > limit:
+                report['sections_removed'] += 1
+                report['tokens_removed'] += tokens
+            else:
+                kept[path].append(text)
+    return kept, report
@@ -3,6 +3,9 @@ import os
 import re
 import glob
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.application.model.parser.dedup import MinHasher, split_sections, select_sections
+from src.application.model.tokens import tokenize
 
 def clean_text(text):
     """
@@ -29,45 +32,74 @@ def clean_text(text):
     
     return text
 
-def process_file(file_path):
+def read_songs(file_path):
     """
-    Process a lyrics file and return a list of cleaned sentences.
+    Read the raw lyrics in a file.
     
     Args:
         file_path (str): Path to the lyrics file
         
     Returns:
-        list: List of cleaned sentences
+        list: Lyrics texts (one per CSV row, or the whole text file)
     """
-    try:
-        if file_path.endswith('.csv'):
-            # Read CSV file
-            df = pd.read_csv(file_path)
-            
-            # Check for 'lyrics' column
-            if 'lyrics' in df.columns:
-                lyrics_text = ' '.join(df['lyrics'].dropna().astype(str))
-            else:
-                # Try to find a column that might contain lyrics
-                text_columns = [col for col in df.columns if df[col].dtype == 'object']
-                if text_columns:
-                    lyrics_text = ' '.join(df[text_columns[0]].dropna().astype(str))
-                else:
-                    raise ValueError(f"Could not find lyrics column in {file_path}")
-        else:
-            # Read as text file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lyrics_text = f.read()
+    if file_path.endswith('.csv'):
+        # Read CSV file
+        df = pd.read_csv(file_path)
         
-        lyrics_text = lyrics_text.lower()
+        # Check for 'lyrics' column
+        if 'lyrics' in df.columns:
+            return df['lyrics'].dropna().astype(str).tolist()
         
+        # Try to find a column that might contain lyrics
+        text_columns = [col for col in df.columns if df[col].dtype == 'object']
+        if text_columns:
+            return df[text_columns[0]].dropna().astype(str).tolist()
+        raise ValueError(f"Could not find lyrics column in {file_path}")
+    
+    # Read as text file
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return [f.read()]
 
-        lyrics_text = re.sub(r'[^\w\s.,!?\()" -]+', '', lyrics_text)
+def extract_sentences(lyrics_text):
+    """
+    Split raw lyrics into cleaned sentences.
+    
+    Args:
+        lyrics_text (str): Raw lyrics
         
-        sentences = re.split(r'[.!?;\n]', lyrics_text)
+    Returns:
+        list: List of cleaned sentences
+    """
+    lyrics_text = lyrics_text.lower()
+    
+
+    lyrics_text = re.sub(r'[^\w\s.,!?\()" -]+', '', lyrics_text)
+    
+    sentences = re.split(r'[.!?;\n]', lyrics_text)
+    
+    # Clean each sentence
+    return [clean_text(sentence) for sentence in sentences if len(clean_text(sentence)) > 0]
+
+def process_file(file_path, dedup=None, threshold=0.8):
+    """
+    Process a lyrics file and return a list of cleaned sentences.
+    
+    Args:
+        file_path (str): Path to the lyrics file
+        dedup (str, optional): Duplicate section policy ('drop',
+            'downweight' or 'keep'); see process_files
+        threshold (float): Near-duplicate similarity threshold
         
-        # Clean each sentence
-        cleaned_sentences = [clean_text(sentence) for sentence in sentences if len(clean_text(sentence)) > 0]
+    Returns:
+        list: List of cleaned sentences
+    """
+    if dedup is not None:
+        sentences, _ = process_files([file_path], dedup=dedup, threshold=threshold, workers=1)
+        return sentences[file_path]
+    
+    try:
+        lyrics_text = ' '.join(read_songs(file_path))
+        cleaned_sentences = extract_sentences(lyrics_text)
         
         print(f"Processed {file_path}: {len(cleaned_sentences)} sentences extracted")
         return cleaned_sentences
@@ -76,6 +108,75 @@ def process_file(file_path):
         print(f"Error processing {file_path}: {str(e)}")
         return []
 
+def _section_tokens(section):
+    """Count the tokens a model trained on this section would see."""
+    return sum(len(tokenize(sentence)) for sentence in extract_sentences(section))
+
+def _file_signatures(file_path):
+    """
+    Read a file's sections, per song, then MinHash them and count their
+    tokens (runs in a worker process).
+    """
+    try:
+        songs = [split_sections(song) for song in read_songs(file_path)]
+    except Exception as e:
+        print(f"Error processing {file_path}: {str(e)}")
+        return [], [], []
+    hasher = MinHasher()
+    return (songs, [[hasher.signature(sec) for sec in song] for song in songs],
+            [[_section_tokens(sec) for sec in song] for song in songs])
+
+def process_files(file_paths, dedup='drop', threshold=0.8, max_copies=2, workers=None):
+    """
+    Process lyrics files, removing duplicate songs and sections across them.
+    
+    Sections (blocks separated by blank lines) are MinHashed in parallel,
+    one file per worker, then matched with LSH in file order, so a chorus
+    repeated within a song and a song uploaded twice are both caught.
+    
+    Args:
+        file_paths (list): Paths to the lyrics files
+        dedup (str): 'drop' keeps the first copy of each duplicate,
+            'downweight' keeps up to max_copies, 'keep' keeps all and only
+            reports
+        threshold (float): Estimated Jaccard similarity for near-duplicates
+        max_copies (int): Copies kept per duplicate under 'downweight'
+        workers (int, optional): Worker processes (default: one per CPU);
+            1 runs in this process
+        
+    Returns:
+        tuple: (dict of file path -> cleaned sentences, dedup report)
+    """
+    file_paths = list(file_paths)
+    if workers == 1 or len(file_paths) == 1:
+        results = [_file_signatures(path) for path in file_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_file_signatures, file_paths))
+    
+    # one entry per song, in file order, so songs can be rejoined as process_file does
+    sections = {}
+    signatures = {}
+    token_counts = {}
+    for path, (songs, song_signatures, song_tokens) in zip(file_paths, results):
+        for i, song in enumerate(songs):
+            sections[path, i] = song
+            signatures[path, i] = song_signatures[i]
+            token_counts[path, i] = song_tokens[i]
+    kept, report = select_sections(sections, signatures, policy=dedup, threshold=threshold,
+                                   max_copies=max_copies, token_counts=token_counts)
+    
+    sentences = {}
+    for path, (songs, _, _) in zip(file_paths, results):
+        # sections of a song are separate lines; songs are joined with a
+        # space like the rows in process_file, so 'keep' changes nothing
+        lyrics_text = ' '.join('\n'.join(kept[path, i]) for i in range(len(songs)))
+        sentences[path] = extract_sentences(lyrics_text)
+        print(f"Processed {path}: {len(sentences[path])} sentences extracted")
+    print(f"Deduplication ({dedup}): {report['duplicate_sections']} of {report['sections']} sections "
+          f"were duplicates, {report['tokens_removed']} of {report['tokens']} tokens removed")
+    return sentences, report
+
 def get_available_files(directory='../data', extensions=None):
     """
     Get a list of lyrics files in the specified directory.
@@ -31,7 +31,9 @@ if __name__ == "__main__":
     process_kaggle_data(args.input, args.output)
 
 
-def generate_lyrics(models, model, seed_text=None, count=5, max_length=50):
+def generate_lyrics(models, model, seed_text=None, count=5, max_length=50,
+                    ngram_index=None, avoid_copying=False, stats=None, vocab_filter=None,
+                    temperature=1.0):
     """
     Generate multiple lyrics samples using back‑off across model orders.
 
@@ -41,10 +43,21 @@ def generate_lyrics(models, model, seed_text=None, count=5, max_length=50):
         seed_text (str, optional): text to prime the generator
         count (int): how many samples to generate
         max_length (int): max tokens per sample
+        ngram_index (NgramIndex, optional): index of the training text
+        avoid_copying (bool): steer away from continuations that repeat a
+            run of ``ngram_index.length`` tokens from the training text
+        stats (dict, optional): accumulates token and back-off counts
+        vocab_filter (VocabularyFilter, optional): blocklist/allowlist; the
+            models' masked tables are compiled on first use and cached
+        temperature (float): higher = more random, lower = more common words
 
     Returns:
         list[str]: generated lyric strings
     """
+    if vocab_filter is not None:
+        models = {o: m.constrain(vocab_filter) for o, m in models.items()}
+        model = model.constrain(vocab_filter)
+
     results = []
     if seed_text:
         seed_words = re.findall(r'\b\w+\b|[.!?,]', seed_text.lower())
@@ -52,7 +65,11 @@ def generate_lyrics(models, model, seed_text=None, count=5, max_length=50):
         seed_words = None
 
     for _ in range(count):
-        sample = model.generate_with_backoff(models, seed_words, max_length)
+        sample = model.generate_with_backoff(models, seed_words, max_length,
+                                             ngram_index=ngram_index,
+                                             avoid_copying=avoid_copying,
+                                             stats=stats,
+                                             temperature=temperature)
         results.append(sample)
 
     return results
\ No newline at end of file
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+import sys
+from collections import Counter, defaultdict
+
+
+def estimate_model_bytes(model):
+    """
+    Estimate the memory held by a MarkovModel's transition table.
+
+    Counts the dict itself, every context tuple, every successor list and
+    each distinct word object they reference.
+
+    Args:
+        model (MarkovModel): trained model
+
+    Returns:
+        int: approximate size in bytes
+    """
+    total = sys.getsizeof(model.model)
+    seen = set()
+    for ctx, nexts in model.model.items():
+        total += sys.getsizeof(ctx) + sys.getsizeof(nexts)
+        for w in ctx:
+            if id(w) not in seen:
+                seen.add(id(w))
+                total += sys.getsizeof(w)
+        for w in nexts:
+            if id(w) not in seen:
+                seen.add(id(w))
+                total += sys.getsizeof(w)
+    return total
+
+
+def _entry_bytes(ctx, nexts):
+    # cost of one context entry, ignoring words shared with other entries
+    return (sys.getsizeof(ctx) + sys.getsizeof(nexts)
+            + sum(sys.getsizeof(w) for w in ctx)
+            + sum(sys.getsizeof(w) for w in nexts))
+
+
+def prune_model(model, min_count=1, top_k=None, memory_budget=None):
+    """
+    Prune rare contexts and successors from a trained model in place.
+
+    Contexts seen fewer than ``min_count`` times are dropped, as are
+    successors seen fewer than ``min_count`` times within a context. Each
+    context then keeps at most its ``top_k`` most frequent successors. If
+    ``memory_budget`` is given, the least frequent contexts are dropped until
+    the estimated size fits. Dropped contexts are handled at generation time
+    by generate_with_backoff falling back to the lower-order models.
+
+    Args:
+        model (MarkovModel): trained model to prune
+        min_count (int): minimum count for a context or successor to survive
+        top_k (int, optional): maximum distinct successors per context
+        memory_budget (int, optional): target size in bytes for the table
+
+    Returns:
+        dict: before/after sizes, bytes saved, entries removed and the share
+        of training transitions (probability mass) that was dropped
+    """
+    if min_count < 1:
+        raise ValueError("min_count must be at least 1")
+    if top_k is not None and top_k < 1:
+        raise ValueError("top_k must be at least 1")
+
+    bytes_before = estimate_model_bytes(model)
+    contexts_before = len(model.model)
+    transitions_before = 0
+    successors_removed = 0
+
+    for ctx in list(model.model):
+        nexts = model.model[ctx]
+        transitions_before += len(nexts)
+        if len(nexts) < min_count:
+            successors_removed += len(set(nexts))
+            del model.model[ctx]
+            continue
+        counts = Counter(nexts)
+        keep = {w for w, c in counts.items() if c >= min_count}
+        if top_k is not None and len(keep) > top_k:
+            keep = set([w for w, _ in counts.most_common() if w in keep][:top_k])
+        if len(keep) == len(counts):
+            continue
+        successors_removed += len(counts) - len(keep)
+        if keep:
+            model.model[ctx] = [w for w in nexts if w in keep]
+        else:
+            del model.model[ctx]
+
+    # a dict never shrinks its table on deletion, so rebuild it
+    model.model = defaultdict(list, model.model)
+
+    if memory_budget is not None and estimate_model_bytes(model) > memory_budget:
+        # keep the most frequent contexts that fit, charging each its own
+        # objects plus its share of the dict table
+        slot = sys.getsizeof(model.model) / max(len(model.model), 1)
+        used = sys.getsizeof({})
+        for ctx in sorted(model.model, key=lambda c: len(model.model[c]), reverse=True):
+            nexts = model.model[ctx]
+            cost = _entry_bytes(ctx, nexts) + slot
+            if used + cost > memory_budget:
+                successors_removed += len(set(nexts))
+                del model.model[ctx]
+            else:
+                used += cost
+        model.model = defaultdict(list, model.model)
+
+    transitions_after = sum(len(nexts) for nexts in model.model.values())
+    bytes_after = estimate_model_bytes(model)
+    return {
+        'order': model.order,
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+        'bytes_saved': bytes_before - bytes_after,
+        'contexts_before': contexts_before,
+        'contexts_after': len(model.model),
+        'successors_removed': successors_removed,
+        'transitions_before': transitions_before,
+        'transitions_after': transitions_after,
+        'mass_dropped': (1 - transitions_after / transitions_before) if transitions_before else 0.0,
+    }
+
+
+def prune_models(models, min_count=1, top_k=None, memory_budget=None):
+    """
+    Prune a set of back-off models, with one memory budget for all of them.
+
+    Every model is first pruned with ``min_count`` and ``top_k``. If the
+    tables together still exceed ``memory_budget``, contexts of every order
+    but the lowest are dropped greedily, fewest transitions per byte first
+    (ties go to the highest order), until they fit. The lowest order is the
+    back-off floor and is never pruned to meet the budget, so the budget can
+    be missed if it alone is larger.
+
+    Args:
+        models (dict[int, MarkovModel]): trained models keyed by order
+        min_count (int): minimum count for a context or successor to survive
+        top_k (int, optional): maximum distinct successors per context
+        memory_budget (int, optional): target size in bytes for all tables
+
+    Returns:
+        dict: totals over all models (as prune_model) plus a per-order
+        ``models`` list of prune_model reports
+    """
+    reports = {o: prune_model(m, min_count=min_count, top_k=top_k) for o, m in models.items()}
+    total = sum(r['bytes_after'] for r in reports.values())
+    if memory_budget is not None and total > memory_budget and len(models) > 1:
+        floor = min(models)
+        candidates = []
+        for o, m in models.items():
+            if o == floor:
+                continue
+            slot = sys.getsizeof(m.model) / max(len(m.model), 1)
+            for ctx, nexts in m.model.items():
+                cost = _entry_bytes(ctx, nexts) + slot
+                candidates.append((len(nexts) / cost, -o, cost, ctx))
+        candidates.sort(key=lambda c: c[:2])
+        # an entry's cost counts words it shares with its neighbours, so it
+        # overstates what dropping it frees: drop in rounds and re-measure
+        pos = 0
+        while total > memory_budget and pos < len(candidates):
+            excess = total - memory_budget
+            while excess > 0 and pos < len(candidates):
+                _, neg_order, cost, ctx = candidates[pos]
+                pos += 1
+                reports[-neg_order]['successors_removed'] += len(set(models[-neg_order].model.pop(ctx)))
+                excess -= cost
+            # a dict never shrinks its table on deletion, so rebuild it
+            for o, m in models.items():
+                if o != floor:
+                    m.model = defaultdict(list, m.model)
+            total = sum(estimate_model_bytes(m) for m in models.values())
+
+        for o, m in models.items():
+            if o == floor:
+                continue
+            r = reports[o]
+            r['bytes_after'] = estimate_model_bytes(m)
+            r['bytes_saved'] = r['bytes_before'] - r['bytes_after']
+            r['contexts_after'] = len(m.model)
+            r['transitions_after'] = sum(len(nexts) for nexts in m.model.values())
+            r['mass_dropped'] = ((1 - r['transitions_after'] / r['transitions_before'])
+                                 if r['transitions_before'] else 0.0)
+
+    summed = ('bytes_before', 'bytes_after', 'bytes_saved', 'contexts_before', 'contexts_after',
+              'successors_removed', 'transitions_before', 'transitions_after')
+    report = {key: sum(r[key] for r in reports.values()) for key in summed}
+    report['mass_dropped'] = ((1 - report['transitions_after'] / report['transitions_before'])
+                              if report['transitions_before'] else 0.0)
+    report['models'] = [reports[o] for o in sorted(reports)]
+    return report
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+import random
+import re
+from array import array
+from collections import OrderedDict, defaultdict, deque
+
+VOWELS = re.compile(r'[aeiouy]+')
+
+
+def _letters(word):
+    word = re.sub(r'[^a-z]', '', word.lower())
+    # silent final e: "time" rhymes like "rhym(e)"
+    if len(word) > 2 and word.endswith('e') and word[-2] not in 'aeiouy':
+        word = word[:-1]
+    return word
+
+
+def rhyme_class(word):
+    """
+    Approximate rhyme class of a word: its last vowel group and what follows.
+
+    Spelling-based and offline, so it is a heuristic ("night"/"light" ->
+    "ight", "time"/"rhyme" -> "im"); words without a vowel have no class.
+
+    Args:
+        word (str): word to classify
+
+    Returns:
+        str | None: rhyme class
+    """
+    letters = _letters(word)
+    groups = list(VOWELS.finditer(letters))
+    if not groups:
+        return None
+    return letters[groups[-1].start():].replace('y', 'i')
+
+
+def count_syllables(word):
+    """Approximate syllable count from vowel groups (at least 1)."""
+    return max(1, len(VOWELS.findall(_letters(word))))
+
+
+class RhymeIndex:
+    """
+    Rhyme classes and syllable counts for a model's vocabulary, plus cached
+    per-context reachability used to steer line endings.
+
+    Args:
+        model (MarkovModel): trained model whose contexts are steered
+        horizon (int): how many words before the end of a line steering
+            starts; reachability is precomputed up to this depth
+        max_cached (int): rhyme classes whose reachability is kept
+    """
+
+    def __init__(self, model, horizon=10, max_cached=64):
+        self.model = model
+        self.horizon = horizon
+        self.rhyme = {}
+        self.syllables = {}
+        self.classes = defaultdict(set)
+        self.endings = defaultdict(set)
+        self.frequency = defaultdict(int)
+        for ctx, nexts in model.model.items():
+            for w in set(ctx).union(nexts):
+                if w not in self.rhyme:
+                    cls = rhyme_class(w)
+                    self.rhyme[w] = cls
+                    self.syllables[w] = count_syllables(w)
+                    if cls is not None:
+                        self.classes[cls].add(w)
+            for w in nexts:
+                if self.rhyme[w] is not None:
+                    self.frequency[self.rhyme[w]] += 1
+            for w in set(nexts):
+                if self.rhyme[w] is not None:
+                    self.endings[self.rhyme[w]].add(w)
+        self._graph = None
+        self._reach = OrderedDict()
+        self.max_cached = max_cached
+
+    def _build_graph(self):
+        # contexts and rhyming words as integer ids; the reverse transition
+        # graph (context -> contexts that can lead to it) and, per rhyming
+        # word, the contexts it can follow
+        if self._graph is None:
+            table = self.model.model
+            ctx_ids = {ctx: i for i, ctx in enumerate(table)}
+            word_ids = {w: i for i, w in enumerate(w for words in self.endings.values() for w in words)}
+            preds = [[] for _ in range(len(ctx_ids))]
+            enders = defaultdict(list)
+            for ctx, i in ctx_ids.items():
+                for w in set(table[ctx]):
+                    if w in word_ids:
+                        enders[word_ids[w]].append(i)
+                    j = ctx_ids.get(ctx[1:] + (w,))
+                    if j is not None:
+                        preds[j].append(i)
+            start_ids = [ctx_ids.get(tuple(s), -1) for s in self.model.starts]
+            self._graph = ctx_ids, word_ids, preds, enders, start_ids
+        return self._graph
+
+    def _nearest_two(self, cls):
+        # per context, the distance to the nearest rhyming word (and which
+        # word it is) and to the nearest different one, 0 if beyond horizon:
+        # a BFS from every word of the class, each context settled at most
+        # once per word and twice in total
+        ctx_ids, word_ids, preds, enders, _ = self._build_graph()
+        n = len(ctx_ids)
+        d1, d2 = bytearray(n), bytearray(n)
+        label = array('i', [-1]) * n
+        queue = deque()
+        for w in self.endings.get(cls, ()):
+            wid = word_ids[w]
+            for c in enders.get(wid, ()):
+                if not d1[c]:
+                    d1[c], label[c] = 1, wid
+                    queue.append((c, wid, 1))
+                elif not d2[c] and label[c] != wid:
+                    d2[c] = 1
+                    queue.append((c, wid, 1))
+        horizon = self.horizon
+        while queue:
+            c, wid, d = queue.popleft()
+            if d >= horizon:
+                continue
+            d += 1
+            for p in preds[c]:
+                if not d1[p]:
+                    d1[p], label[p] = d, wid
+                    queue.append((p, wid, d))
+                elif not d2[p] and label[p] != wid:
+                    d2[p] = d
+                    queue.append((p, wid, d))
+        return d1, label, d2
+
+    def _search(self, cls, exclude):
+        # single-label BFS toward the class's words minus ``exclude``
+        ctx_ids, word_ids, preds, enders, _ = self._build_graph()
+        dist = bytearray(len(ctx_ids))
+        queue = deque()
+        for w in self.endings.get(cls, set()) - exclude:
+            for c in enders.get(word_ids[w], ()):
+                if not dist[c]:
+                    dist[c] = 1
+                    queue.append(c)
+        while queue:
+            c = queue.popleft()
+            d = dist[c] + 1
+            if d > self.horizon:
+                continue
+            for p in preds[c]:
+                if not dist[p]:
+                    dist[p] = d
+                    queue.append(p)
+        return dist
+
+    def distances(self, cls, exclude=()):
+        """
+        Steps from each context to a word of rhyme class ``cls``.
+
+        Returns a read-only mapping: a context maps to 1 if one of its
+        successors rhymes, to k if it can reach such a context in k - 1
+        further words; contexts farther than ``horizon`` are absent. Words in
+        ``exclude`` do not count as rhymes. The nearest two distinct rhyming
+        words are precomputed once per class (the ``max_cached`` most
+        recently used classes are kept), so excluding one word, such as the
+        previous line's ending, costs nothing extra.
+        """
+        exclude = frozenset(exclude) & self.endings.get(cls, set())
+        reachable = bool(self.endings.get(cls, set()) - exclude)
+        if len(exclude) > 1:
+            # rare: more words excluded than precomputed, search directly
+            return _Reachability(self, self._search(cls, exclude), None, None, -1, reachable)
+        reach = self._reach.get(cls)
+        if reach is None:
+            reach = self._reach[cls] = self._nearest_two(cls)
+            if len(self._reach) > self.max_cached:
+                self._reach.popitem(last=False)
+        else:
+            self._reach.move_to_end(cls)
+        excluded = self._graph[1][next(iter(exclude))] if exclude else -1
+        return _Reachability(self, *reach, excluded, reachable)
+
+    def rhyming_classes(self, min_words=2):
+        """Rhyme classes with at least ``min_words`` distinct words that can end a line."""
+        return [cls for cls, words in self.endings.items() if len(words) >= min_words]
+
+
+class _Reachability:
+    """Distances of RhymeIndex.distances with at most one rhyming word excluded."""
+
+    def __init__(self, index, d1, label, d2, excluded, reachable):
+        self._ctx_ids = index._graph[0]
+        self._start_ids = index._graph[4]
+        self._starts = index.model.starts
+        self._d1, self._label, self._d2 = d1, label, d2
+        self._excluded = excluded
+        self._reachable = reachable
+
+    def _at(self, i):
+        if self._label is not None and self._label[i] == self._excluded:
+            return self._d2[i]
+        return self._d1[i]
+
+    def get(self, ctx, default=None):
+        i = self._ctx_ids.get(ctx)
+        return (self._at(i) or default) if i is not None else default
+
+    def __contains__(self, ctx):
+        return self.get(ctx) is not None
+
+    def __bool__(self):
+        # every word that can end a line follows some context at distance 1
+        return self._reachable
+
+    def starts(self, limit):
+        """Sentence starts at most ``limit`` words from a rhyming word."""
+        at = self._at
+        return [s for s, i in zip(self._starts, self._start_ids) if i >= 0 and 0 < at(i) <= limit]
+
+
+def _successor_tables(models, model, line):
+    # successor lists for the end of ``line``, in generate_with_backoff's
+    # back-off order
+    current = tuple(line[-model.order:])
+    if current in model.model:
+        yield model.model[current]
+    for o in range(model.order - 1, 0, -1):
+        short = tuple(line[-o:])
+        if o in models and len(line) >= o and short in models[o].model:
+            yield models[o].model[short]
+
+
+def generate_line(models, model, rhyme_index, target=None, exclude=(), min_words=4, max_words=10):
+    """
+    Generate one line whose last word belongs to rhyme class ``target``.
+
+    Words are drawn with generate_with_backoff's back-off rules; within
+    ``rhyme_index.horizon`` words of ``max_words`` only successors that can
+    still reach a rhyming word in the remaining budget are allowed, taken
+    from the highest order that offers one. The line ends on the first
+    rhyming word after ``min_words``.
+
+    Args:
+        models (dict[int, MarkovModel]): models for back-off
+        model (MarkovModel): primary model, the one ``rhyme_index`` indexes
+        rhyme_index (RhymeIndex): index built from ``model``
+        target (str, optional): rhyme class; unconstrained if None
+        exclude (iterable[str]): words not accepted as the rhyme (e.g. the
+            previous line's last word)
+        min_words (int): minimum words in the line
+        max_words (int): maximum words in the line
+
+    Returns:
+        list[str]: the line's words
+    """
+    order = model.order
+    if not model.starts:
+        return []
+    rhymes = rhyme_index.classes.get(target, set()) - set(exclude)
+    dist = rhyme_index.distances(target, exclude) if target is not None else {}
+    starts = model.starts
+    if target is not None:
+        starts = dist.starts(max_words - order) or starts
+    line = list(random.choice(starts))
+
+    while len(line) < max_words:
+        if target is not None and len(line) >= min_words and line[-1] in rhymes:
+            break
+        current = tuple(line[-order:])
+        remaining = max_words - len(line)
+        if target is not None and remaining <= rhyme_index.horizon:
+            def allowed(w):
+                if w in rhymes:
+                    return len(line) + 1 >= min_words
+                return dist.get(current[1:] + (w,), remaining + 1) < remaining
+            steered = None
+            for choices in _successor_tables(models, model, line):
+                ok = {w for w in set(choices) if allowed(w)}
+                if ok:
+                    steered = [w for w in choices if w in ok]
+                    break
+            if steered:
+                line.append(random.choice(steered))
+                continue
+        choices = next(_successor_tables(models, model, line), None)
+        if choices is None:
+            base = models.get(1)
+            if not base or not base.model:
+                break
+            choices = base.model[random.choice(list(base.model.keys()))]
+        line.append(random.choice(choices))
+    return line
+
+
+def generate_couplet(models, model, rhyme_index=None, min_words=4, max_words=10, target=None):
+    """
+    Generate two lines ending in the same rhyme class.
+
+    Args:
+        models (dict[int, MarkovModel]): models for back-off
+        model (MarkovModel): primary model
+        rhyme_index (RhymeIndex, optional): built from ``model`` if omitted;
+            pass one in to reuse its cached reachability
+        min_words (int): minimum words per line
+        max_words (int): maximum words per line
+        target (str, optional): rhyme class; by default one is picked at
+            random among classes with at least two words that can end a
+            line, weighted by how often the corpus uses it
+
+    Returns:
+        list[dict]: two lines, each with ``text``, ``rhyme``, ``syllables``
+        and ``rhymes`` (False if the couplet's endings do not rhyme)
+    """
+    if rhyme_index is None:
+        rhyme_index = RhymeIndex(model)
+    if target is None:
+        classes = rhyme_index.rhyming_classes()
+        if not classes:
+            raise ValueError("Vocabulary has no rhyming word pairs")
+        target = random.choices(classes, weights=[rhyme_index.frequency[c] for c in classes])[0]
+
+    first = generate_line(models, model, rhyme_index, target, (), min_words, max_words)
+    ending = first[-1:]
+    # rhyme with the class the first line actually ended on, if another
+    # word of it can still be reached
+    ended = rhyme_index.rhyme.get(first[-1]) if first else None
+    if ended is not None and ended != target and rhyme_index.distances(ended, ending):
+        target = ended
+    second = generate_line(models, model, rhyme_index, target, ending, min_words, max_words)
+
+    classes = [rhyme_index.rhyme.get(line[-1]) if line else None for line in (first, second)]
+    rhymes = (classes[0] is not None and classes[0] == classes[1] and first[-1] != second[-1])
+    return [{
+        'text': ' '.join(line),
+        'rhyme': cls,
+        'syllables': sum(rhyme_index.syllables.get(w, 1) for w in line),
+        'rhymes': rhymes,
+    } for line, cls in zip((first, second), classes)]
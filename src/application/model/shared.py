@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import sys
+from multiprocessing import shared_memory
+from src.application.model.compact import CompactMarkovModel, pack_model
+
+# models attached by init_worker, one set per worker process
+_worker_models = None
+
+
+def _attach_segment(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+class SharedModels:
+    """
+    A set of Markov models (keyed by order) published into shared memory.
+
+    The publishing process packs each model once; workers attach by handle
+    and read transitions in place, so a pool costs roughly one model plus a
+    per-worker vocabulary table.
+
+    Example:
+        with SharedModels.publish(models) as shared:
+            with Pool(4, initializer=init_worker, initargs=(shared.handle,)) as pool:
+                pool.map(job, seeds)   # job calls worker_models()
+    """
+
+    def __init__(self, segments, owner):
+        self._segments = segments
+        self._owner = owner
+        self.models = {order: CompactMarkovModel(shm.buf) for order, shm in segments.items()}
+
+    @classmethod
+    def publish(cls, models):
+        """
+        Copy trained models into new shared memory segments.
+
+        Args:
+            models (dict[int, MarkovModel]): trained models keyed by order
+
+        Returns:
+            SharedModels: owner handle; call unlink() (or use it as a
+            context manager) once the workers are done
+        """
+        segments = {}
+        try:
+            for order, model in models.items():
+                buf = pack_model(model)
+                shm = shared_memory.SharedMemory(create=True, size=len(buf))
+                shm.buf[:len(buf)] = buf
+                segments[order] = shm
+        except Exception:
+            for shm in segments.values():
+                shm.close()
+                shm.unlink()
+            raise
+        return cls(segments, owner=True)
+
+    @classmethod
+    def attach(cls, handle):
+        """Attach to models published elsewhere, given their handle."""
+        return cls({order: _attach_segment(name) for order, name in handle.items()}, owner=False)
+
+    @property
+    def handle(self):
+        """Picklable ``{order: segment name}`` mapping to pass to workers."""
+        return {order: shm.name for order, shm in self._segments.items()}
+
+    @property
+    def nbytes(self):
+        """Total size of the published model data in bytes."""
+        return sum(m.model.size for m in self.models.values())
+
+    def close(self):
+        """Detach this process from the segments."""
+        for model in self.models.values():
+            model.release()
+        self.models = {}
+        for shm in self._segments.values():
+            shm.close()
+
+    def unlink(self):
+        """Close and, if this process published them, destroy the segments."""
+        self.close()
+        if self._owner:
+            for shm in self._segments.values():
+                shm.unlink()
+        self._segments = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.unlink()
+
+
+def init_worker(handle):
+    """Pool initializer: attach to the shared models for this process."""
+    global _worker_models
+    _worker_models = SharedModels.attach(handle)
+
+
+def worker_models():
+    """Return the models attached by init_worker in this worker process."""
+    if _worker_models is None:
+        raise RuntimeError("init_worker has not been called in this process")
+    return _worker_models.models
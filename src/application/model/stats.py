@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+import sys
+import numpy as np
+import pandas as pd
+
+# upper edges of the branching-factor histogram buckets
+BRANCHING_BINS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+
+def model_stats(model, top=10):
+    """
+    Summarise a trained MarkovModel in one vectorised pass.
+
+    The successor lists are flattened once into integer arrays; every
+    statistic is then computed with numpy group-bys over those arrays.
+
+    Args:
+        model (MarkovModel): trained model
+        top (int): how many top contexts and words to list
+
+    Returns:
+        dict: JSON-serialisable statistics: counts, branching-factor
+        distribution, conditional entropy, top contexts/words and a memory
+        footprint breakdown in bytes
+    """
+    table = model.model
+    contexts = list(table.keys())
+    lists = list(table.values())
+    n_ctx = len(contexts)
+    labels = [f"<={b}" for b in BRANCHING_BINS] + [f">{BRANCHING_BINS[-1]}"]
+    if n_ctx == 0:
+        # e.g. an order longer than every sentence: same schema, all zero
+        memory = {'dict': sys.getsizeof(table), 'keys': 0, 'lists': 0, 'words': 0}
+        memory['total'] = sum(memory.values())
+        return {
+            'order': model.order,
+            'contexts': 0,
+            'transitions': 0,
+            'distinct_transitions': 0,
+            'vocabulary': 0,
+            'starts': len(model.starts),
+            'branching': {
+                'mean': 0.0,
+                'median': 0.0,
+                'p90': 0.0,
+                'max': 0,
+                'deterministic_share': 0.0,
+                'histogram': dict.fromkeys(labels, 0),
+            },
+            'entropy_bits': 0.0,
+            'top_contexts': [],
+            'top_words': [],
+            'memory_bytes': memory,
+        }
+
+    lengths = np.fromiter(map(len, lists), dtype=np.int64, count=n_ctx)
+    flat = [w for nexts in lists for w in nexts]
+    n_trans = len(flat)
+    word_ids, vocab = pd.factorize(pd.Series(flat, dtype=object))
+    n_vocab = len(vocab)
+    ctx_index = np.repeat(np.arange(n_ctx, dtype=np.int64), lengths)
+
+    # (context, successor) pairs and their counts
+    pairs, pair_counts = np.unique(ctx_index * n_vocab + word_ids, return_counts=True)
+    pair_ctx = pairs // n_vocab
+    branching = np.bincount(pair_ctx, minlength=n_ctx)
+
+    # H(next | context) per context, then weighted by context frequency
+    p = pair_counts / lengths[pair_ctx]
+    ctx_entropy = np.bincount(pair_ctx, weights=-p * np.log2(p), minlength=n_ctx)
+    entropy = float(np.dot(ctx_entropy, lengths) / n_trans)
+
+    edges = [0] + [b + 0.5 for b in BRANCHING_BINS] + [max(BRANCHING_BINS[-1], branching.max()) + 1]
+    hist, _ = np.histogram(branching, bins=edges)
+
+    top_ctx = np.argsort(-lengths, kind='stable')[:top]
+    word_counts = np.bincount(word_ids, minlength=n_vocab)
+    top_words = np.argsort(-word_counts, kind='stable')[:top]
+
+    # memory: dict table, key tuples, successor lists and the distinct str
+    # objects they hold (counted per object, as each occurrence may be one)
+    object_ids = np.fromiter(map(id, flat), dtype=np.int64, count=n_trans)
+    _, first = np.unique(object_ids, return_index=True)
+    word_sizes = np.fromiter(map(sys.getsizeof, vocab), dtype=np.int64, count=n_vocab)
+    memory = {
+        'dict': sys.getsizeof(table),
+        'keys': n_ctx * sys.getsizeof(contexts[0]),
+        'lists': int(np.sum(np.fromiter(map(sys.getsizeof, lists), dtype=np.int64, count=n_ctx))),
+        'words': int(word_sizes[word_ids[first]].sum()),
+    }
+    memory['total'] = sum(memory.values())
+
+    return {
+        'order': model.order,
+        'contexts': n_ctx,
+        'transitions': n_trans,
+        'distinct_transitions': int(len(pairs)),
+        'vocabulary': n_vocab,
+        'starts': len(model.starts),
+        'branching': {
+            'mean': float(branching.mean()),
+            'median': float(np.median(branching)),
+            'p90': float(np.percentile(branching, 90)),
+            'max': int(branching.max()),
+            'deterministic_share': float(np.mean(branching == 1)),
+            'histogram': dict(zip(labels, hist.tolist())),
+        },
+        'entropy_bits': entropy,
+        'top_contexts': [{'context': ' '.join(contexts[i]), 'transitions': int(lengths[i]),
+                          'distinct': int(branching[i])} for i in top_ctx],
+        'top_words': [{'word': vocab[i], 'count': int(word_counts[i])} for i in top_words],
+        'memory_bytes': memory,
+    }
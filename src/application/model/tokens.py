@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+import re
+
+TOKEN_RE = re.compile(r'\b\w+\b|[.!?,]')
+
+
+def tokenize(sentence):
+    """Split a sentence into tokens exactly as MarkovModel.train does."""
+    return TOKEN_RE.findall(sentence.lower())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from src.application.model.model import MarkovModel
+from src.application.model.parser.parser import process_file, get_available_files
+
+
+def scan_directory(directory, extensions=None):
+    """Return ``{path: (mtime_ns, size)}`` for the lyrics files in a directory."""
+    snapshot = {}
+    for path in get_available_files(directory, extensions):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        snapshot[path] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+
+def _remove_counts(items, remove):
+    # copy of ``items`` without the occurrences counted in ``remove``
+    remove = Counter(remove)
+    kept = []
+    for item in items:
+        if remove[item] > 0:
+            remove[item] -= 1
+        else:
+            kept.append(item)
+    return kept
+
+
+def apply_delta(model, removed, added):
+    """
+    Return a new model equal to ``model`` minus ``removed`` plus ``added``.
+
+    Only the contexts touched by the two deltas get new successor lists;
+    every other list is shared with ``model``, which is left unchanged so
+    generation running against it is unaffected.
+
+    Args:
+        model (MarkovModel): current model
+        removed (MarkovModel | None): contributions to take out
+        added (MarkovModel | None): contributions to put in
+
+    Returns:
+        MarkovModel: the updated copy
+    """
+    updated = MarkovModel(order=model.order)
+    updated.model = defaultdict(list, model.model)
+    starts = model.starts
+    if removed is not None:
+        for ctx, nexts in removed.model.items():
+            kept = _remove_counts(updated.model.get(ctx, []), nexts)
+            if kept:
+                updated.model[ctx] = kept
+            else:
+                updated.model.pop(ctx, None)
+        starts = _remove_counts(starts, removed.starts)
+    if added is not None:
+        for ctx, nexts in added.model.items():
+            updated.model[ctx] = updated.model.get(ctx, []) + nexts
+        starts = starts + added.starts
+    updated.starts = list(starts)
+    return updated
+
+
+class ModelWatcher:
+    """
+    Keep a set of models trained on a data directory up to date.
+
+    A background thread polls the directory's file mtimes and sizes. When
+    files are added, changed or removed, only those files are re-read: their
+    old contributions are subtracted and the new ones added to copies of the
+    models, which then replace the current set in one reference swap.
+    Readers should fetch ``watcher.models`` once per generation; a model set
+    is never modified after it has been published.
+
+    Args:
+        directory (str): data directory to watch
+        orders (iterable[int]): model orders to keep trained
+        interval (float): seconds between polls
+        extensions (list[str], optional): file extensions, as for
+            get_available_files
+    """
+
+    def __init__(self, directory, orders=(1, 2, 3, 4, 5), interval=2.0, extensions=None):
+        self.directory = directory
+        self.orders = tuple(orders)
+        self.interval = interval
+        self.extensions = extensions
+        self.models = {o: MarkovModel(order=o) for o in self.orders}
+        self.metrics = {
+            'version': 0,
+            'reloads': 0,
+            'errors': 0,
+            'files': 0,
+            'last_reload_s': None,
+            'last_lag_s': None,
+            'last_reload_at': None,
+        }
+        self._snapshot = {}
+        self._sentences = {}
+        # lag is measured from here for files older than the watcher
+        self._started_at = time.time()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """
+        Check the directory once and apply any changes.
+
+        Returns:
+            bool: True if a new model set was published
+        """
+        detected = time.time()
+        snapshot = scan_directory(self.directory, self.extensions)
+        changed = [p for p in snapshot if self._snapshot.get(p) != snapshot[p]]
+        deleted = [p for p in self._snapshot if p not in snapshot]
+        if not changed and not deleted:
+            return False
+
+        start = time.perf_counter()
+        new_sentences = {p: process_file(p) for p in changed}
+        # training is additive per sentence, so one delta covers all files
+        old = [s for p in changed + deleted for s in self._sentences.get(p, [])]
+        new = [s for p in changed for s in new_sentences[p]]
+        models = {o: apply_delta(m, self._train(o, old), self._train(o, new))
+                  for o, m in self.models.items()}
+
+        # publish: a single reference assignment, atomic for readers
+        self.models = models
+        for path in deleted:
+            self._sentences.pop(path, None)
+        self._sentences.update(new_sentences)
+        self._snapshot = snapshot
+
+        newest_change = max((snapshot[p][0] / 1e9 for p in changed), default=detected)
+        newest_change = max(newest_change, self._started_at)
+        self.metrics.update({
+            'version': self.metrics['version'] + 1,
+            'reloads': self.metrics['reloads'] + 1,
+            'files': len(snapshot),
+            'last_reload_s': time.perf_counter() - start,
+            'last_lag_s': max(0.0, time.time() - newest_change),
+            'last_reload_at': time.time(),
+        })
+        return True
+
+    @staticmethod
+    def _train(order, sentences):
+        if not sentences:
+            return None
+        model = MarkovModel(order=order)
+        model.train(sentences)
+        return model
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.metrics['errors'] += 1
+                print(f"Error reloading models from {self.directory}: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Load the directory now, then keep polling in a daemon thread."""
+        self.poll()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the polling thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
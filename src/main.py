@@ -2,8 +2,23 @@
 import os
 import sys
 import argparse
-from src.application.model.parser.parser import process_file, get_available_files
+from src.application.model.parser.parser import process_file, process_files, get_available_files
 from src.application.model.model import MarkovModel
+from src.application.model.parser.prep_data import generate_lyrics
+from src.application.model.batch import read_seeds, run_batch
+from src.application.model.watch import ModelWatcher
+from src.application.model.constraints import VocabularyFilter, constrain_models
+from src.application.model.pruning import prune_models
+from src.application.model.originality import NgramIndex
+
+
+def train_models(sentences, order):
+    """Train models of every order up to ``order`` for back-off."""
+    models = {}
+    for o in range(1, order + 1):
+        models[o] = MarkovModel(order=o)
+        models[o].train(sentences)
+    return models
 
 
 def main():
@@ -16,14 +31,44 @@ def main():
     parser.add_argument('--order', '-o', type=int, default=2, help='Order of the Markov model (default: 2)')
     parser.add_argument('--save-model', '-s', help='Save trained model to file')
     parser.add_argument('--load-model', '-m', help='Load trained model from file')
+    parser.add_argument('--dedup', choices=['drop', 'downweight', 'keep'], default=None,
+                        help='Detect duplicate songs/sections and drop them, keep at most two copies, or only report')
+    parser.add_argument('--min-count', type=int, default=1,
+                        help='Prune contexts and successors seen fewer times than this (default: 1)')
+    parser.add_argument('--top-k', type=int, default=None, help='Keep at most K successors per context')
+    parser.add_argument('--memory-budget', type=int, default=None,
+                        help='Prune rare contexts until all models together fit in this many bytes')
     
     parser.add_argument('--lines', '-n', type=int, default=5, help='Number of lines to generate (default: 5)')
     parser.add_argument('--max-length', type=int, default=30, help='Maximum line length in words (default: 30)')
     parser.add_argument('--temperature', '-t', type=float, default=1.0, 
                         help='Temperature for generation (higher = more random, default: 1.0)')
     parser.add_argument('--seed', help='Seed words to start generation')
+    parser.add_argument('--avoid-copying', action='store_true',
+                        help='Steer away from repeating runs of --copy-length words from the training text')
+    parser.add_argument('--copy-length', type=int, default=None,
+                        help='Length of a verbatim run counted as copying (default: 8); '
+                             'samples are scored for originality')
+    parser.add_argument('--blocklist', help='File of words never to generate, one per line')
+    parser.add_argument('--allowlist', help='File of the only words that may be generated, one per line')
+    parser.add_argument('--batch', '-b', help="File of seeds, one per line ('-' for stdin); "
+                        "writes one JSON line per seed to stdout")
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Worker processes for --batch (default: 1)')
+    parser.add_argument('--watch', type=float, nargs='?', const=2.0, default=None, metavar='SECONDS',
+                        help='With --batch and an input directory, reload changed files every SECONDS (default: 2)')
     
     args = parser.parse_args()
+    if args.temperature <= 0:
+        parser.error("--temperature must be positive")
+    if args.copy_length is not None and args.copy_length < 2:
+        parser.error("--copy-length must be at least 2")
+    originality = args.avoid_copying or args.copy_length is not None
+    
+    # Keep stdout for JSON lines in batch mode; progress goes to stderr
+    out = sys.stdout
+    if args.batch:
+        sys.stdout = sys.stderr
     
     # List available files
     if args.list_files:
@@ -37,13 +82,35 @@ def main():
             print(f"No lyrics files found in {data_dir}")
         return
     
+    pruning = args.min_count > 1 or args.top_k or args.memory_budget
+    if pruning and args.watch:
+        print("--min-count, --top-k and --memory-budget cannot be used with --watch: "
+              "reloaded models are not pruned")
+        return
+    if originality and (args.watch or args.load_model):
+        print("--avoid-copying and --copy-length need the training text: "
+              "use --input without --load-model or --watch")
+        return
+    
     # Create or load model
     model = None
+    models = {}
+    watcher = None
+    sentences = None
+    
+    if args.watch:
+        if not (args.batch and args.input and os.path.isdir(args.input)):
+            print("--watch requires --batch and an --input directory")
+            return
+        watcher = ModelWatcher(args.input, orders=range(1, args.order + 1), interval=args.watch).start()
+        models = watcher.models
+        model = models[args.order]
     
     if args.load_model:
         if os.path.exists(args.load_model):
             try:
                 model = MarkovModel.load(args.load_model)
+                models = {model.order: model}
                 print(f"Model loaded successfully from {args.load_model}")
             except Exception as e:
                 print(f"Error loading model: {e}")
@@ -56,15 +123,16 @@ def main():
     if args.input and not model:
         if os.path.isfile(args.input):
             print(f"Processing file: {args.input}")
-            lyrics = process_file(args.input)
+            lyrics = process_file(args.input, dedup=args.dedup)
             
             if not lyrics:
                 print(f"No lyrics found in {args.input}")
                 return
                 
             print(f"Training model with order {args.order}...")
-            model = MarkovModel(order=args.order)
-            model.train(lyrics)
+            sentences = lyrics
+            models = train_models(lyrics, args.order)
+            model = models[args.order]
             
         elif os.path.isdir(args.input):
             # Train on all files in directory
@@ -75,23 +143,42 @@ def main():
                 
             print(f"Training model on {len(files)} files from {args.input}...")
             all_lyrics = []
-            for file in files:
-                print(f"Processing {os.path.basename(file)}...")
-                lyrics = process_file(file)
-                if lyrics:
+            if args.dedup:
+                by_file, _ = process_files(files, dedup=args.dedup)
+                for lyrics in by_file.values():
                     all_lyrics.extend(lyrics)
+            else:
+                for file in files:
+                    print(f"Processing {os.path.basename(file)}...")
+                    lyrics = process_file(file)
+                    if lyrics:
+                        all_lyrics.extend(lyrics)
             
             if not all_lyrics:
                 print("No lyrics extracted from files")
                 return
                 
             print(f"Training model with order {args.order}...")
-            model = MarkovModel(order=args.order)
-            model.train(all_lyrics)
+            sentences = all_lyrics
+            models = train_models(all_lyrics, args.order)
+            model = models[args.order]
         else:
             print(f"Input path not found: {args.input}")
             return
     
+    # Prune every model, back-off orders included, if requested
+    if model and pruning:
+        report = prune_models(models, min_count=args.min_count, top_k=args.top_k,
+                              memory_budget=args.memory_budget)
+        for r in report['models']:
+            print(f"Pruned order {r['order']}: {r['contexts_before']} -> {r['contexts_after']} contexts, "
+                  f"{r['bytes_saved'] / 1e6:.1f} MB saved")
+        print(f"Pruned {len(report['models'])} models: {report['bytes_before'] / 1e6:.1f} -> "
+              f"{report['bytes_after'] / 1e6:.1f} MB, "
+              f"{report['mass_dropped']:.1%} of probability mass dropped")
+        if args.memory_budget and report['bytes_after'] > args.memory_budget:
+            print(f"Warning: memory budget not met; order {min(models)} is kept whole as the back-off floor")
+
     # Save model if requested
     if args.save_model and model:
         try:
@@ -100,21 +187,64 @@ def main():
         except Exception as e:
             print(f"Error saving model: {e}")
     
+    # Vocabulary constraints
+    vocab_filter = None
+    if args.blocklist or args.allowlist:
+        try:
+            vocab_filter = VocabularyFilter.from_files(args.blocklist, args.allowlist)
+        except OSError as e:
+            print(f"Error reading word list: {e}")
+            return
+    
+    # Index the training text to score (and avoid) verbatim copying
+    ngram_index = None
+    if originality and sentences:
+        ngram_index = NgramIndex(sentences, length=args.copy_length or 8)
+    
     # Generate lyrics
-    if model:
+    if model and args.batch:
+        processed = run_batch(
+            (lambda: constrain_models(watcher.models, vocab_filter)) if watcher
+            else constrain_models(models, vocab_filter),
+            model.order,
+            read_seeds(args.batch),
+            out=out,
+            count=args.lines,
+            max_length=args.max_length,
+            workers=args.workers,
+            temperature=args.temperature,
+            ngram_index=ngram_index,
+            avoid_copying=args.avoid_copying
+        )
+        print(f"Generated lyrics for {processed} seeds")
+        if watcher:
+            watcher.stop()
+            print(f"Model reloads: {watcher.metrics}")
+    elif model:
         print("\nGenerated lyrics:")
         print("=" * 40)
         
-        lines = model.generate(
-            num_lines=args.lines,
+        lines = generate_lyrics(
+            models,
+            model,
+            seed_text=args.seed,
+            count=args.lines,
             max_length=args.max_length,
+            vocab_filter=vocab_filter,
             temperature=args.temperature,
-            seed=args.seed
+            ngram_index=ngram_index,
+            avoid_copying=args.avoid_copying
         )
         
         for line in lines:
             print(line)
         
+        if ngram_index is not None:
+            scores = [ngram_index.check(line) for line in lines]
+            print("-" * 40)
+            print(f"Originality: mean {sum(s['originality'] for s in scores) / len(scores):.1%}, "
+                  f"longest copied run {max(s['longest_copy'] for s in scores)} words")
+        
         print("=" * 40)
     else:
         print("No model available. Please provide an input file or load a model.")